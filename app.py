@@ -5,22 +5,46 @@ Features implemented (high-level):
 - Sidebar for candidate inputs (Full name, email, phone, years exp, desired role, location, tech stack)
 - Option to choose 3-5 questions PER TECHNOLOGY (assignment asks 3-5 per tech)
 - Adaptive prompts based on years of experience (fresher / junior / mid-level)
-- Per-tech question generation (LLM call per tech) with parsing and fallback templates
+- Question generation in one batched LLM call (concurrent per-tech retries) with parsing and fallback templates
 - Chat UI in main page: ask one question at a time, accept candidate answer, produce LLM feedback
-- Context handling (session_state stores conversation, questions, answers)
+- Feedback mode: per-answer (streamed) or a single batched evaluation at the end of the interview
+- Context handling (session_state stores conversation, questions, answers as parallel lists)
 - Fallback mechanism when LLM fails or returns unparsable results
+- Response caching (exact-prompt for generation, exact normalized answer for feedback)
 - Graceful conversation end & simulated candidate saving
 - Docstrings and comments for maintainability
 """
 
 import streamlit as st
-import time
+import json
+import threading
 import re
-from typing import List, Dict
-from openRouter_client import OpenRouterClient
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import List, Dict, Optional
+from openRouter_client import OpenRouterClient, KEEPALIVE_EXPIRY
 
 st.set_page_config(page_title="TalentScout Hiring Assistant", layout="wide")
 
+# Patterns used by parse_grouped_questions (compiled once, not per line)
+_HEAD_RE = re.compile(r'^([A-Za-z0-9 _\-\+\.\#]+)\s*[:\-]\s*$')
+_NUM_RE = re.compile(r'^\d+\.\s*(.+)$')
+_Q_PREFIXES = ("what", "how", "explain", "describe", "why", "when", "give")
+# local@domain.tld, no whitespace or extra "@"
+_EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
+# Answers longer than this are condensed by the cheap model before evaluation
+SUMMARIZE_ANSWER_OVER = 400
+# Long answers reach the evaluator as a cheap-model summary carrying this prefix
+SUMMARY_PREFIX = "(summary) "
+SUMMARY_NOTE = (f"Answers starting with {SUMMARY_PREFIX.strip()} are condensed versions of longer answers: "
+                "judge only their technical content, not their wording or clarity.")
+
+# Feedback modes offered in the sidebar
+FEEDBACK_PER_ANSWER = "Per-answer"
+FEEDBACK_AT_END = "End of interview"
+
 # ---------------------------
 # Simulated persistent storage (in-memory for this demo)
 # ---------------------------
@@ -29,12 +53,54 @@ class SimulatedStorage:
         self._last_candidate = None
 
     def save_candidate(self, candidate: dict):
-        """Simulates saving candidate info (in-memory only)."""
-        self._last_candidate = {k: v for k, v in candidate.items() if k != "greeted"}
+        """Simulates saving candidate info (in-memory only). Underscore keys are session-only caches."""
+        self._last_candidate = {
+            k: v for k, v in candidate.items()
+            if k not in ("greeted", "eval_prompt_template") and not k.startswith("_")
+        }
 
     def last_saved(self):
         return self._last_candidate
 
+
+# ---------------------------
+# Answer-feedback cache (shared across sessions)
+# ---------------------------
+def normalize_answer(text: str) -> str:
+    """Case- and whitespace-insensitive form of an answer, used as a cache key."""
+    return " ".join(text.lower().split())
+
+
+class FeedbackCache:
+    """
+    Returns cached feedback for an answer whose normalized text exactly matches one seen
+    before for the same question key. Only exact matches hit: answers that differ by a
+    single word ("mutable" vs "immutable") can deserve opposite feedback.
+    """
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: tuple, answer: str) -> Optional[str]:
+        entry_key = (key, normalize_answer(answer))
+        with self._lock:
+            if entry_key not in self._entries:
+                return None
+            self._entries.move_to_end(entry_key)
+            return self._entries[entry_key]
+
+    def add(self, key: tuple, answer: str, feedback: str):
+        with self._lock:
+            self._entries[(key, normalize_answer(answer))] = feedback
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+@st.cache_resource
+def get_feedback_cache() -> FeedbackCache:
+    return FeedbackCache()
+
 # ---------------------------
 # Utility functions
 # ---------------------------
@@ -42,25 +108,26 @@ def is_exit_command(text: str):
     return text.lower().strip() in ["exit", "quit", "bye", "goodbye"]
 
 def validate_email(email: str):
-    return "@" in email and "." in email
+    return _EMAIL_RE.fullmatch(email.strip()) is not None
 
 def validate_phone(phone: str):
-    digits = "".join([c for c in phone if c.isdigit()])
-    return len(digits) >= 8
+    return sum(c.isdigit() for c in phone) >= 8
 
 # ---------------------------
 # Session-state initialization
 # ---------------------------
-if "conversation" not in st.session_state:
-    st.session_state.conversation = []
+# Conversation is stored column-wise: conv_roles[i] / conv_texts[i] describe message i,
+# conv_html[i] is its rendered bubble (None if not displayed)
+if "conv_roles" not in st.session_state:
+    st.session_state.conv_roles = []
+    st.session_state.conv_texts = []
+    st.session_state.conv_html = []
 if "candidate" not in st.session_state:
     st.session_state.candidate = {}
 if "finished" not in st.session_state:
     st.session_state.finished = False
 if "chat_started" not in st.session_state:
     st.session_state.chat_started = False
-if "llm" not in st.session_state:
-    st.session_state.llm = OpenRouterClient()
 if "storage" not in st.session_state:
     st.session_state.storage = SimulatedStorage()
 
@@ -68,40 +135,110 @@ if "storage" not in st.session_state:
 # ---------------------------
 # Helpers
 # ---------------------------
+def get_llm() -> OpenRouterClient:
+    """Session's LLM client, created on first use so the initial page load doesn't pay for it."""
+    if "llm" not in st.session_state:
+        st.session_state.llm = OpenRouterClient()
+    return st.session_state.llm
+
+
+def prewarm_llm():
+    """
+    Fire-and-forget warmup request (once per session) so TLS setup and provider-side
+    model cold start happen in the background instead of on the first real request.
+    """
+    llm = get_llm()
+    _ = llm.client  # build the client here: secrets are read on the script thread
+    threading.Thread(target=llm.warmup, daemon=True).start()
+    st.session_state.llm_prewarmed = True
+
+
+_FEEDBACK_WORDS = ("feedback", "evaluation", "well done", "good job", "suggestion", "improvement")
+_BUBBLE_STYLES = {
+    "user": "background:#fff3e0; color:#6d4c41; border-radius:12px; padding:14px 20px; margin:18px 0 18px auto; max-width:60%; display:inline-block; float:right; clear:both; text-align:right; font-size:1rem;",
+    "feedback": "background:#e8f5e9; color:#256029; border-radius:12px; padding:14px 20px; margin:18px auto 18px 0; max-width:60%; display:inline-block; clear:both; font-size:1rem;",
+    "assistant": "background:#e6f0ff; color:#1a237e; border-radius:12px; padding:14px 20px; margin:18px auto 18px 0; max-width:60%; display:inline-block; clear:both; font-size:1rem;",
+}
+
+
+def message_html(role: str, text: str) -> Optional[str]:
+    """
+    Chat-bubble markup for a message (feedback-looking assistant messages get their own style).
+    Returns None for roles that aren't displayed.
+    """
+    if role == "user":
+        style = _BUBBLE_STYLES["user"]
+    elif role == "assistant":
+        is_feedback = any(word in text.lower() for word in _FEEDBACK_WORDS)
+        style = _BUBBLE_STYLES["feedback" if is_feedback else "assistant"]
+    else:
+        return None
+    return f"<div style='{style}'>{text}</div>"
 
 
 def append(role: str, text: str):
-    """Append a message to conversation and print a console log for debugging."""
-    st.session_state.conversation.append({"role": role, "text": text})
+    """Append a message to the conversation (its bubble markup is built once, here)."""
+    st.session_state.conv_roles.append(role)
+    st.session_state.conv_texts.append(text)
+    st.session_state.conv_html.append(message_html(role, text))
+
+
+def format_question(q: Dict[str, str]) -> str:
+    """Chat text for asking a question."""
+    return f"({q['tech']}) {q['question']}"
+
+
+def cancel_keepalive():
+    """Cancel the pending keep-alive ping scheduled by prepare_next_question, if any."""
+    timer = st.session_state.pop("keepalive_timer", None)
+    if timer is not None:
+        timer.cancel()
+
+
+def prepare_next_question(c: dict):
+    """
+    Called right after a question is shown, while the candidate is busy typing:
+    pre-render the following question's chat text and schedule a keep-alive ping
+    so the next LLM call doesn't pay for a pooled connection that expired meanwhile.
+    Only one ping is pending per session; none in end-of-interview mode, where no
+    LLM call follows the answer.
+    """
+    next_idx = c["q_index"] + 1
+    if next_idx < len(c["questions"]):
+        c["_next_q_rendered"] = format_question(c["questions"][next_idx])
+    cancel_keepalive()
+    if c.get("feedback_mode") == FEEDBACK_AT_END:
+        return
+    # the timer thread only touches the client, never Streamlit APIs
+    ping_after = KEEPALIVE_EXPIRY * 0.75
+    timer = threading.Timer(ping_after, get_llm().warmup, kwargs={"idle_for": ping_after})
+    timer.daemon = True
+    timer.start()
+    st.session_state.keepalive_timer = timer
 
 
 def reset():
     """Reset the whole interview session (clears conversation and candidate)."""
-    st.session_state.conversation = []
+    cancel_keepalive()
+    st.session_state.conv_roles = []
+    st.session_state.conv_texts = []
+    st.session_state.conv_html = []
     st.session_state.candidate = {}
     st.session_state.finished = False
     st.session_state.chat_started = False
 
 
-def safe_generate(prompt: str, retries: int = 3, backoff: float = 1.5):
+def safe_generate(prompt: str, llm: Optional[OpenRouterClient] = None, bypass_cache: bool = False,
+                  json_mode: bool = False):
     """
-    Call the LLM generate method with retries and exponential backoff.
+    Call the LLM generate method. Retries with backoff (honouring Retry-After) are
+    handled by the OpenAI SDK client configured in OpenRouterClient.
+    Pass `llm` explicitly when calling from a worker thread (session_state is not available there).
+    `bypass_cache` skips the client's exact-prompt response cache; `json_mode` asks for a JSON object response.
     Raises the final exception if all retries fail.
     """
-    last_exc = None
-    for attempt in range(retries):
-        try:
-            return st.session_state.llm.generate(prompt)
-        except Exception as e:
-            last_exc = e
-            # backoff sleep except before last attempt
-            if attempt < retries - 1:
-                time.sleep(backoff * (attempt + 1))
-                continue
-            else:
-                # re-raise after final attempt
-                raise last_exc
-    raise last_exc
+    llm = llm or get_llm()
+    return llm.generate(prompt, bypass_cache=bypass_cache, json_mode=json_mode)
 
 
 def parse_grouped_questions(raw_text: str) -> List[Dict[str, str]]:
@@ -115,21 +252,21 @@ def parse_grouped_questions(raw_text: str) -> List[Dict[str, str]]:
         line = line.strip()
         if not line:
             continue
-        # heading e.g., "Python:" or "Python -"
-        head_match = re.match(r'^([A-Za-z0-9 _\-\+\.\#]+)\s*[:\-]\s*$', line)
+        # heading e.g., "Python:" or "Python -" (markdown decoration like "**Python:**" / "### Python:" ignored)
+        head_match = _HEAD_RE.match(line.strip("*").lstrip("#").strip())
         if head_match:
             current_tech = head_match.group(1).strip()
             continue
 
         # numbered question like "1. What is ...?"
-        num_match = re.match(r'^\d+\.\s*(.+)$', line)
+        num_match = _NUM_RE.match(line)
         if num_match:
             q = num_match.group(1).strip().rstrip('.')
             questions.append({"tech": current_tech, "question": q})
             continue
 
         # plain question line fallback (if it looks like a question)
-        if line.endswith('?') or line.lower().startswith(("what", "how", "explain", "describe", "why", "when", "give")):
+        if line.endswith('?') or line.lower().startswith(_Q_PREFIXES):
             questions.append({"tech": current_tech, "question": line.rstrip('.')})
             continue
 
@@ -137,46 +274,83 @@ def parse_grouped_questions(raw_text: str) -> List[Dict[str, str]]:
     return questions
 
 
+# Generic base fallback templates ({tech} is filled in per call)
+_BASE_TEMPLATES = (
+    "What is {tech} and where is it commonly used?",
+    "Name one common task you would perform using {tech}. How would you start?",
+    "Explain a basic concept or term related to {tech} that a beginner should know.",
+    "Describe a simple example or use-case of {tech}.",
+    "What are common tools or libraries used with {tech}?",
+)
+_SQL_OVERRIDES = (
+    (0, "What is a database table and a row?"),
+    (1, "What is a primary key and why is it important?"),
+)
+_WEB_FRAMEWORK_OVERRIDES = (
+    (0, "What is a web framework like {tech}, and when would you use it?"),
+    (1, "How do you handle incoming HTTP requests in a simple route?"),
+)
+# Tech-specific mild customization for common techs: (template index, replacement) pairs.
+# Checked in order against the lowercased tech name; the first substring match wins.
+_TECH_OVERRIDES = {
+    "python": (
+        (1, "How do you write a function in Python? Give a short example."),
+        (2, "What is a list in Python and how is it different from a tuple?"),
+    ),
+    "react": (
+        (0, "What is a component in React?"),
+        (1, "How do you pass data from parent to child component in React?"),
+    ),
+    "sql": _SQL_OVERRIDES,
+    "postgres": _SQL_OVERRIDES,
+    "mysql": _SQL_OVERRIDES,
+    "django": _WEB_FRAMEWORK_OVERRIDES,
+    "fastapi": _WEB_FRAMEWORK_OVERRIDES,
+    "flask": _WEB_FRAMEWORK_OVERRIDES,
+    "javascript": (
+        (0, "What is JavaScript and how is it used in web development?"),
+        (1, "What's the difference between var/let/const in JavaScript?"),
+    ),
+    "node": (
+        (0, "What is Node.js used for?"),
+        (1, "How would you create a simple HTTP server in Node?"),
+    ),
+}
+# Exact-name aliases (a substring match on "js" would also catch "node.js")
+_TECH_ALIASES = {"js": "javascript"}
+
+
+@lru_cache(maxsize=256)
+def _fallback_cached(tech: str, n: int) -> tuple:
+    """Deterministic fallback questions for (tech, n) as a tuple of (tech, question) pairs."""
+    tech_lower = tech.lower()
+    tech_key = _TECH_ALIASES.get(tech_lower, tech_lower)
+    templates = list(_BASE_TEMPLATES)
+    for key, overrides in _TECH_OVERRIDES.items():
+        if key in tech_key:
+            for idx, template in overrides:
+                templates[idx] = template
+            break
+    # pick first n templates
+    return tuple((tech, t.format(tech=tech)) for t in templates[:n])
+
+
 def fallback_questions_for_tech(tech: str, n: int, years_exp: float) -> List[Dict[str, str]]:
     """
     Provide safe fallback questions if LLM can't produce them.
     These are intentionally simple and cover basics appropriate to candidate level.
-    Returns list of dicts {"tech": tech, "question": ...}
+    Returns list of dicts {"tech": tech, "question": ...} (fresh dicts, safe to mutate)
     """
-    level = "fresher" if years_exp < 1 else "junior" if years_exp < 3 else "mid-level"
-    tech_lower = tech.lower()
-    templates = []
-
-    # Generic base templates
-    templates.append(f"What is {tech} and where is it commonly used?")
-    templates.append(f"Name one common task you would perform using {tech}. How would you start?")
-    templates.append(f"Explain a basic concept or term related to {tech} that a beginner should know.")
-    templates.append(f"Describe a simple example or use-case of {tech}.")
-    templates.append(f"What are common tools or libraries used with {tech}?")
-
-    # Tech-specific mild customization for common techs
-    if "python" in tech_lower:
-        templates[1] = "How do you write a function in Python? Give a short example."
-        templates[2] = "What is a list in Python and how is it different from a tuple?"
-    elif "react" in tech_lower:
-        templates[0] = "What is a component in React?"
-        templates[1] = "How do you pass data from parent to child component in React?"
-    elif "sql" in tech_lower or "postgres" in tech_lower or "mysql" in tech_lower:
-        templates[0] = "What is a database table and a row?"
-        templates[1] = "What is a primary key and why is it important?"
-    elif "django" in tech_lower or "fastapi" in tech_lower or "flask" in tech_lower:
-        templates[0] = f"What is a web framework like {tech}, and when would you use it?"
-        templates[1] = "How do you handle incoming HTTP requests in a simple route?"
-    elif "javascript" in tech_lower or tech_lower == "js":
-        templates[0] = "What is JavaScript and how is it used in web development?"
-        templates[1] = "What's the difference between var/let/const in JavaScript?"
-    elif "node" in tech_lower:
-        templates[0] = "What is Node.js used for?"
-        templates[1] = "How would you create a simple HTTP server in Node?"
+    return [{"tech": t, "question": q} for t, q in _fallback_cached(tech, n)]
 
-    # pick first n templates
-    picked = templates[:n]
-    return [{"tech": tech, "question": q} for q in picked]
+
+def question_level(years_exp: float) -> str:
+    """Difficulty label used in question-generation prompts."""
+    if years_exp <= 1:
+        return "entry-level (fresher)"
+    elif years_exp <= 3:
+        return "junior-level"
+    return "mid-level (practical, not deep system design)"
 
 
 def build_per_tech_prompt(tech: str, years_exp: float, n: int = 3):
@@ -184,51 +358,238 @@ def build_per_tech_prompt(tech: str, years_exp: float, n: int = 3):
     Build a prompt requesting n beginner/junior/mid-level questions for a single technology.
     The prompt is explicit about candidate experience so the LLM tailors difficulty.
     """
-    if years_exp <= 1:
-        level = "entry-level (fresher)"
-    elif years_exp <= 3:
-        level = "junior-level"
-    else:
-        level = "mid-level (practical, not deep system design)"
+    level = question_level(years_exp)
+    example = json.dumps({"questions": ["..."] * n})
 
     return (
         f"You are an interviewer preparing questions for a {level} candidate.\n"
         f"Generate {n} open-ended, beginner-friendly technical interview questions about this technology: {tech}.\n"
         f"Focus on core concepts and practical basics that a {level} candidate should know.\n"
-        f"Output as a numbered list (1., 2., ...). Do NOT provide answers or extra commentary."
+        f"Output JSON only, in the form {example}. Do NOT provide answers or extra commentary."
+    )
+
+
+def build_stack_prompt(tech_stack: List[str], years_exp: float, n: int = 3):
+    """
+    Build a single prompt requesting n questions for every technology in tech_stack,
+    as a JSON object keyed by tech so parse_json_questions can split them.
+    """
+    level = question_level(years_exp)
+    example = json.dumps({"questions": {tech: ["..."] * n for tech in tech_stack}})
+
+    return (
+        f"You are an interviewer preparing questions for a {level} candidate.\n"
+        f"Generate {n} open-ended, beginner-friendly technical interview questions for EACH of these technologies: "
+        f"{', '.join(tech_stack)}.\n"
+        f"Focus on core concepts and practical basics that a {level} candidate should know.\n"
+        f"Output JSON only, with one list of questions per technology, in the form: {example}\n"
+        f"Use the technology names exactly as given as keys. Do NOT provide answers or extra commentary."
+    )
+
+
+def evaluation_level(years_exp: float) -> str:
+    """Candidate level label used in answer-evaluation prompts."""
+    return "entry-level (fresher)" if years_exp < 1 else "junior-level" if years_exp < 3 else "mid-level"
+
+
+def build_eval_prompt_template(level: str, years_exp: float) -> str:
+    """
+    Build the per-session evaluation prompt with the candidate level already filled in.
+    The result still has {tech}, {question} and {answer} placeholders for str.format.
+    """
+    return (
+        f"You are an interviewer/evaluator. The candidate is {level} with {years_exp} years experience.\n"
+        "Question (technology: {tech}): {question}\n"
+        "Candidate's answer: {answer}\n\n"
+        "Provide a short evaluation focusing on:\n"
+        "- Correctness (was the core idea addressed?)\n"
+        "- Clarity (is it explained clearly?)\n"
+        "- Depth (is it appropriate for the candidate's experience?)\n"
+        "Then give 2-3 concrete suggestions the candidate could study to improve.\n"
+        f"{SUMMARY_NOTE}\n"
+        "Keep the feedback concise (2-4 sentences) and friendly."
+    )
+
+
+def build_batch_eval_prompt(level: str, years_exp: float,
+                            techs: List[str], questions: List[str], answers: List[str]) -> str:
+    """
+    Build one prompt asking the model to evaluate every (tech, question, answer) in the
+    parallel lists, returning a JSON array with one feedback object per answer.
+    """
+    items = "\n".join(
+        f"{i}. Question (technology: {tech}): {question}\n   Candidate's answer: {answer}"
+        for i, (tech, question, answer) in enumerate(zip(techs, questions, answers), start=1)
+    )
+    return (
+        f"You are an interviewer/evaluator. The candidate is {level} with {years_exp} years experience.\n"
+        "Evaluate each of the candidate's answers below, focusing on:\n"
+        "- Correctness (was the core idea addressed?)\n"
+        "- Clarity (is it explained clearly?)\n"
+        "- Depth (is it appropriate for the candidate's experience?)\n"
+        "Then give 2-3 concrete suggestions the candidate could study to improve.\n"
+        f"{SUMMARY_NOTE}\n"
+        "Keep each evaluation concise (2-4 sentences) and friendly.\n\n"
+        f"{items}\n\n"
+        'Respond with ONLY a JSON array, one object per answer in the same order: '
+        '[{"index": 1, "feedback": "..."}, {"index": 2, "feedback": "..."}]'
     )
 
 
+def parse_batch_feedback(raw_text: str, n: int) -> List[Optional[str]]:
+    """
+    Parse the JSON array returned for build_batch_eval_prompt. Tolerates code fences or
+    text around the array; entries are matched by "index" when present, else by position.
+    Returns n items, None where no feedback could be found.
+    """
+    feedbacks = [None] * n
+    start, end = raw_text.find("["), raw_text.rfind("]")
+    if start == -1 or end <= start:
+        return feedbacks
+    try:
+        items = json.loads(raw_text[start:end + 1])
+    except ValueError:
+        return feedbacks
+    if not isinstance(items, list):
+        return feedbacks
+    for pos, item in enumerate(items):
+        if isinstance(item, dict):
+            idx, text = item.get("index", pos + 1), item.get("feedback")
+        else:
+            idx, text = pos + 1, item
+        if isinstance(idx, int) and 1 <= idx <= n and isinstance(text, str) and text.strip():
+            feedbacks[idx - 1] = text.strip()
+    return feedbacks
+
+
+def parse_json_questions(raw_text: str, tech_stack: List[str]) -> Optional[Dict[str, List[Dict[str, str]]]]:
+    """
+    Parse JSON question output: {"questions": {tech: [...]}} or, for a single tech,
+    {"questions": [...]}. Tech keys are matched case-insensitively; unknown keys are dropped.
+    Returns {tech: [{tech, question}, ...]}, or None if raw_text isn't JSON in that shape
+    (callers then fall back to parse_grouped_questions).
+    """
+    start, end = raw_text.find("{"), raw_text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        questions = json.loads(raw_text[start:end + 1])["questions"]
+    except (ValueError, TypeError, KeyError):
+        return None
+    if isinstance(questions, list) and len(tech_stack) == 1:
+        questions = {tech_stack[0]: questions}
+    if not isinstance(questions, dict):
+        return None
+
+    lookup = {tech.lower(): tech for tech in tech_stack}
+    grouped = {}
+    for name, items in questions.items():
+        tech = lookup.get(str(name).strip().lower())
+        if tech is None or not isinstance(items, list):
+            continue
+        parsed = [{"tech": tech, "question": q.strip().rstrip('.')} for q in items if isinstance(q, str) and q.strip()]
+        if parsed:
+            grouped[tech] = parsed
+    return grouped
+
+
+def group_questions_by_tech(parsed: List[Dict[str, str]], tech_stack: List[str]) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Map parsed questions onto the requested techs by heading (case-insensitive).
+    Questions under unknown headings are dropped.
+    """
+    lookup = {tech.lower(): tech for tech in tech_stack}
+    grouped = {}
+    for q in parsed:
+        if q["tech"] is None:
+            # no heading at all: only unambiguous for a single-tech stack
+            tech = tech_stack[0] if len(tech_stack) == 1 else None
+        else:
+            tech = lookup.get(q["tech"].lower())
+        if tech is not None:
+            grouped.setdefault(tech, []).append({"tech": tech, "question": q["question"]})
+    return grouped
+
+
+def generate_questions_per_tech(tech_stack: List[str], years_exp: float, per_tech_n: int,
+                                llm: OpenRouterClient) -> Dict[str, List[Dict[str, str]]]:
+    """
+    One LLM call per tech, dispatched concurrently (the calls are network-bound).
+    Techs whose reply fails, can't be parsed or has fewer than per_tech_n questions are
+    topped up with built-in template questions, and such a reply is evicted from the
+    response cache so it isn't served again.
+    Returns {tech: [{tech, question}, ...]}.
+    """
+    prompts = [(tech, build_per_tech_prompt(tech, years_exp, per_tech_n)) for tech in tech_stack]
+    by_tech = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(prompts))) as ex:
+        futures = {ex.submit(safe_generate, p, llm=llm, json_mode=True): (tech, p) for tech, p in prompts}
+        for fut in as_completed(futures):
+            tech, prompt = futures[fut]
+            try:
+                raw = fut.result()
+                grouped = parse_json_questions(raw, [tech])
+                if grouped is not None:
+                    parsed = grouped.get(tech, [])
+                else:
+                    # model ignored the JSON format: fall back to the text parser
+                    parsed = parse_grouped_questions(raw)
+                    # if parsed contains tech=None (because model didn't include heading), set tech
+                    for q in parsed:
+                        if q["tech"] is None:
+                            q["tech"] = tech
+                parsed = parsed[:per_tech_n]
+                if len(parsed) < per_tech_n:
+                    # top up from built-in templates; don't keep serving the short reply
+                    llm.forget(prompt, json_mode=True)
+                    asked = {q["question"] for q in parsed}
+                    extra = [q for q in fallback_questions_for_tech(tech, per_tech_n, years_exp)
+                             if q["question"] not in asked]
+                    parsed += extra[:per_tech_n - len(parsed)]
+                    print(f"[WARN] Used fallback questions for {tech}")
+            except Exception as e:
+                print(f"[ERROR] Question generation failed for {tech}: {e}")
+                parsed = fallback_questions_for_tech(tech, per_tech_n, years_exp)
+            by_tech[tech] = parsed
+    return by_tech
+
+
 def generate_questions_for_stack(tech_stack: List[str], years_exp: float, per_tech_n: int) -> List[Dict[str, str]]:
     """
-    Generate questions for each tech in tech_stack using the LLM. If LLM fails or parsing
-    returns nothing for a particular tech, fallback to built-in templates.
-    Returns flattened list of {tech, question}.
+    Generate questions for the whole tech_stack with a single batched LLM call.
+    Techs missing from the batched output (or given fewer than per_tech_n questions)
+    are retried with per-tech calls, and the incomplete reply is evicted from the
+    response cache; if the batched call itself fails, every tech falls back to
+    built-in templates.
+    Returns flattened list of {tech, question}, in tech_stack order (duplicate techs asked once).
     """
+    techs = list(dict.fromkeys(tech_stack))
+    if not techs:
+        return []
+    # resolve the client here: worker threads have no Streamlit script context
+    llm = get_llm()
+    try:
+        prompt = build_stack_prompt(techs, years_exp, per_tech_n)
+        raw = safe_generate(prompt, llm=llm, json_mode=True)
+        grouped = parse_json_questions(raw, techs)
+        if grouped is None:
+            # model ignored the JSON format: fall back to the heading/numbered-list parser
+            grouped = group_questions_by_tech(parse_grouped_questions(raw), techs)
+        by_tech = {tech: qs[:per_tech_n] for tech, qs in grouped.items()}
+        # a tech with fewer than per_tech_n questions counts as missing too
+        missing = [tech for tech in techs if len(by_tech.get(tech, ())) < per_tech_n]
+        if missing:
+            print(f"[WARN] Batched output missed {', '.join(missing)}; retrying per tech")
+            # incomplete reply: don't keep serving it to later candidates with this stack
+            llm.forget(prompt, json_mode=True)
+            by_tech.update(generate_questions_per_tech(missing, years_exp, per_tech_n, llm))
+    except Exception as e:
+        print(f"[ERROR] Question generation failed for stack: {e}")
+        by_tech = {tech: fallback_questions_for_tech(tech, per_tech_n, years_exp) for tech in techs}
+
     all_questions = []
-    for tech in tech_stack:
-        prompt = build_per_tech_prompt(tech, years_exp, per_tech_n)
-        try:
-            raw = safe_generate(prompt)
-            parsed = parse_grouped_questions(raw)
-            # if parsed contains tech=None (because model didn't include heading), set tech
-            for q in parsed:
-                if q["tech"] is None:
-                    q["tech"] = tech
-            if not parsed:
-                # try quick fallback parsing if model returned unnumbered list
-                # fallback to built-in templates
-                parsed = []
-            if parsed:
-                all_questions.extend(parsed)
-            else:
-                fallback = fallback_questions_for_tech(tech, per_tech_n, years_exp)
-                all_questions.extend(fallback)
-                print(f"[WARN] Used fallback questions for {tech}")
-        except Exception as e:
-            print(f"[ERROR] Question generation failed for {tech}: {e}")
-            fallback = fallback_questions_for_tech(tech, per_tech_n, years_exp)
-            all_questions.extend(fallback)
+    for tech in techs:
+        all_questions.extend(by_tech[tech])
     return all_questions
 
 
@@ -245,6 +606,11 @@ with st.sidebar:
     location = st.text_input("Current Location", placeholder="e.g., Bangalore, India")
     tech_stack_text = st.text_input("Tech Stack (comma-separated)", placeholder="e.g., Python, React, SQL")
     per_tech_n = st.slider("Questions per technology (3–5)", min_value=3, max_value=5, value=3)
+    # Warm up the LLM connection while the candidate is still filling in the form
+    if (full_name or tech_stack_text) and not st.session_state.chat_started and "llm_prewarmed" not in st.session_state:
+        prewarm_llm()
+    feedback_mode = st.radio("Feedback mode", [FEEDBACK_PER_ANSWER, FEEDBACK_AT_END], horizontal=True,
+                             help="End of interview: answers are evaluated together after the last question.")
 
     st.markdown("""
         <style>
@@ -271,6 +637,8 @@ with st.sidebar:
         else:
             # Save candidate info
             tech_list = [t.strip() for t in tech_stack_text.split(",") if t.strip()]
+            # years_exp is fixed for the session, so derive the level and eval prompt once
+            level_label = evaluation_level(years_exp)
             st.session_state.candidate = {
                 "full_name": full_name.strip(),
                 "email": email.strip(),
@@ -280,7 +648,13 @@ with st.sidebar:
                 "location": location.strip(),
                 "tech_stack": tech_list,
                 "questions": [],
-                "answers": [],  # store candidate answers
+                # candidate answers, column-wise: ans_texts[i] answers ans_questions[i] (ans_techs[i])
+                "ans_questions": [],
+                "ans_techs": [],
+                "ans_texts": [],
+                "feedback_mode": feedback_mode,
+                "level_label": level_label,
+                "eval_prompt_template": build_eval_prompt_template(level_label, years_exp),
             }
             st.session_state.chat_started = True
             append("assistant", f"Welcome {full_name}! I will ask you questions based on your tech stack: {', '.join(tech_list)}.")
@@ -292,7 +666,8 @@ with st.sidebar:
             # Ask first question
             if questions:
                 first = questions[0]
-                append("assistant", f"({first['tech']}) {first['question']}")
+                append("assistant", format_question(first))
+                prepare_next_question(st.session_state.candidate)
             else:
                 append("assistant", "Could not generate any questions. Please try again later.")
             # Rerun to show chat on main page
@@ -300,62 +675,123 @@ with st.sidebar:
 
 
 # ---------------------------
-# Main: Chat interface
+# Chat interface
 # ---------------------------
-st.markdown("""
-<h1 style='text-align: center; color: #009688; letter-spacing: 1px; font-weight: 800; text-shadow: 1px 1px 3px #009688;'>TalentScout — Interview Chat</h1>
-""", unsafe_allow_html=True)
+def render_conversation(start: int = 0) -> int:
+    """
+    Display conversation history from message `start` on (main page is just chat + final feedback).
+    Returns the number of messages in the conversation, i.e. the next `start`.
+    """
+    rendered = st.session_state.conv_html
+    for html in rendered[start:]:
+        if html is not None:
+            st.markdown(html, unsafe_allow_html=True)
+    return len(rendered)
 
-# Display conversation history (main page is just chat + final feedback)
-for msg in st.session_state.conversation:
-    if msg["role"] == "user":
-        st.markdown(
-            "<div style='background:#fff3e0; color:#6d4c41; border-radius:12px; padding:14px 20px; margin:18px 0 18px auto; max-width:60%; display:inline-block; float:right; clear:both; text-align:right; font-size:1rem;'>"
-            + msg['text'] + "</div>",
-            unsafe_allow_html=True)
-    elif msg["role"] == "assistant":
-        if any(word in msg["text"].lower() for word in ["feedback", "evaluation", "well done", "good job", "suggestion", "improvement"]):
-            st.markdown(
-                "<div style='background:#e8f5e9; color:#256029; border-radius:12px; padding:14px 20px; margin:18px auto 18px 0; max-width:60%; display:inline-block; clear:both; font-size:1rem;'>"
-                + msg['text'] + "</div>",
-                unsafe_allow_html=True)
-        else:
-            st.markdown(
-                "<div style='background:#e6f0ff; color:#1a237e; border-radius:12px; padding:14px 20px; margin:18px auto 18px 0; max-width:60%; display:inline-block; clear:both; font-size:1rem;'>"
-                + msg['text'] + "</div>",
-                unsafe_allow_html=True)
-
-# If chat not started
-if not st.session_state.chat_started:
-    st.info("Fill candidate details on the left and click **Start Chat**. The Questions will appear here.")
-    st.stop()
-
-# If interview finished
-if st.session_state.finished:
-    st.success("Interview complete. Candidate saved (simulated).")
-    # Show last saved candidate object (simulated storage)
+
+def answer_for_eval(answer: str, llm: Optional[OpenRouterClient] = None) -> str:
+    """
+    Text to put in an evaluation prompt for answer: long, rambling answers are condensed
+    by the cheap model (results go through the client's exact-match cache) so the primary
+    model sees fewer tokens, and marked with SUMMARY_PREFIX. Falls back to the full answer
+    if summarising fails. Pass llm when calling off the script thread.
+    """
+    if len(answer) <= SUMMARIZE_ANSWER_OVER:
+        return answer
     try:
-        st.json(st.session_state.storage.last_saved())
-    except Exception:
-        st.write("Saved candidate (simulated) is not available.")
-    if st.button("Start New Interview"):
-        reset()
-        st.rerun()
-    st.stop()
-
-# Chat input (active interview)
-user_input = st.chat_input("Type your answer here... (type 'exit' to finish early)")
-if user_input:
-    text = user_input.strip()
-    append("user", text)
+        summary = (llm or get_llm()).generate_cheap(
+            f"Summarize this interview answer in 2 sentences preserving technical claims:\n{answer}"
+        )
+    except Exception as e:
+        print(f"[WARN] Answer summarisation failed: {e}")
+        return answer
+    return SUMMARY_PREFIX + summary if summary else answer
+
+
+def answer_feedback(c: dict, question: Dict[str, str], answer: str) -> str:
+    """
+    Feedback for a single answer: reuse feedback given to the same (normalized) answer to this
+    question, else stream a fresh evaluation from the LLM.
+    """
+    feedback_cache = get_feedback_cache()
+    cache_key = (question["tech"], question["question"], c["level_label"])
+    feedback = feedback_cache.lookup(cache_key, answer)
+    if feedback is None:
+        # Build evaluation prompt (ask model to evaluate candidate answer for appropriateness to their experience level)
+        eval_prompt = c["eval_prompt_template"].format(
+            tech=question["tech"], question=question["question"], answer=answer_for_eval(answer)
+        )
+        # stream the feedback under the history so the candidate sees it as it is written; the
+        # placeholder is always cleared because the caller appends the full text to the conversation
+        placeholder = st.empty()
+        try:
+            with placeholder.container(), st.chat_message("assistant"):
+                feedback = st.write_stream(get_llm().generate_stream(eval_prompt)).strip()
+            if not feedback:
+                feedback = "No feedback generated by the model."
+            else:
+                feedback_cache.add(cache_key, answer, feedback)
+        except Exception as e:
+            feedback = "Could not generate feedback at this time."
+        finally:
+            placeholder.empty()
+    return feedback
+
 
+def evaluate_all_answers(c: dict) -> List[str]:
+    """
+    End-of-interview feedback: one LLM call evaluates every answer not already covered
+    by the feedback cache. Returns one feedback string per entry in c["ans_texts"].
+    """
+    techs, questions, answers = c["ans_techs"], c["ans_questions"], c["ans_texts"]
+    feedback_cache = get_feedback_cache()
+    keys = [(tech, question, c["level_label"]) for tech, question in zip(techs, questions)]
+    feedbacks = [feedback_cache.lookup(key, answer) for key, answer in zip(keys, answers)]
+    pending = [i for i, fb in enumerate(feedbacks) if fb is None]
+    if pending:
+        llm = get_llm()
+        # summaries are independent cheap-model calls, so run them side by side
+        with ThreadPoolExecutor(max_workers=min(8, len(pending))) as ex:
+            eval_answers = list(ex.map(lambda i: answer_for_eval(answers[i], llm), pending))
+        prompt = build_batch_eval_prompt(
+            c["level_label"], c.get("years_experience", 0.0),
+            [techs[i] for i in pending], [questions[i] for i in pending], eval_answers,
+        )
+        try:
+            parsed = parse_batch_feedback(safe_generate(prompt, bypass_cache=True), len(pending))
+        except Exception as e:
+            print(f"[ERROR] Batch evaluation failed: {e}")
+            parsed = [None] * len(pending)
+        for i, fb in zip(pending, parsed):
+            if fb:
+                feedback_cache.add(keys[i], answers[i], fb)
+            feedbacks[i] = fb or "Could not generate feedback at this time."
+    return feedbacks
+
+
+def finish_interview(c: dict, closing_message: str):
+    """Give any deferred (end-of-interview) feedback, say goodbye, save the candidate (simulated) and finish."""
+    cancel_keepalive()
+    if c.get("feedback_mode") == FEEDBACK_AT_END and c.get("ans_texts"):
+        with st.spinner("Evaluating your answers..."):
+            feedbacks = evaluate_all_answers(c)
+        for tech, question, fb in zip(c["ans_techs"], c["ans_questions"], feedbacks):
+            append("assistant", f"📝 Feedback ({tech}): {question}\n> {fb}")
+    append("assistant", closing_message)
+    st.session_state.storage.save_candidate(c)
+    c["q_index"] = None
+    st.session_state.finished = True
+
+
+def handle_answer(text: str):
+    """
+    Give feedback on the candidate's answer and move on to the next question.
+    The answer itself must already be appended to the conversation.
+    """
     # Exit immediately if requested
     if is_exit_command(text):
-        append("assistant", "Thanks! We've received your responses. We'll review and get back to you.")
-        # Save candidate (simulated) and finish
-        st.session_state.storage.save_candidate(st.session_state.candidate)
-        st.session_state.finished = True
-        st.rerun()
+        finish_interview(st.session_state.candidate, "Thanks! We've received your responses. We'll review and get back to you.")
+        return
 
     # Otherwise handle Q/A
     c = st.session_state.candidate
@@ -363,58 +799,81 @@ if user_input:
 
     if q_idx is None:
         append("assistant", "No more questions. Type `exit` to finish or click 'Start New Interview' in the sidebar.")
-        st.rerun()
+        return
 
     # Get current question
     if "questions" not in c or q_idx >= len(c["questions"]):
         append("assistant", "No more questions available.")
         c["q_index"] = None
-        st.rerun()
+        return
 
     current_q = c["questions"][q_idx]
 
     # Save the answer
-    c.setdefault("answers", []).append({"question": current_q["question"], "tech": current_q["tech"], "answer": text})
+    c["ans_questions"].append(current_q["question"])
+    c["ans_techs"].append(current_q["tech"])
+    c["ans_texts"].append(text)
 
-    # Build evaluation prompt (ask model to evaluate candidate answer for appropriateness to their experience level)
-    years_exp = c.get("years_experience", 0.0)
-    level = "entry-level (fresher)" if years_exp < 1 else "junior-level" if years_exp < 3 else "mid-level"
-
-    eval_prompt = (
-        f"You are an interviewer/evaluator. The candidate is {level} with {years_exp} years experience.\n"
-        f"Question (technology: {current_q['tech']}): {current_q['question']}\n"
-        f"Candidate's answer: {text}\n\n"
-        "Provide a short evaluation focusing on:\n"
-        "- Correctness (was the core idea addressed?)\n"
-        "- Clarity (is it explained clearly?)\n"
-        "- Depth (is it appropriate for the candidate's experience?)\n"
-        "Then give 2-3 concrete suggestions the candidate could study to improve.\n"
-        "Keep the feedback concise (2-4 sentences) and friendly."
-    )
-
-    # Ask LLM for feedback (safe_generate with fallback)
-    try:
-        feedback = safe_generate(eval_prompt)
-        if not feedback or not feedback.strip():
-            feedback = "No feedback generated by the model."
-    except Exception as e:
-        feedback = "Could not generate feedback at this time."
-
-    # Append feedback
-    append("assistant", f"📝 Feedback ({current_q['tech']}):\n> {feedback}")
+    # In end-of-interview mode feedback is batched in finish_interview()
+    if c.get("feedback_mode") != FEEDBACK_AT_END:
+        append("assistant", f"📝 Feedback ({current_q['tech']}):\n> {answer_feedback(c, current_q, text)}")
 
     # Move to next question
     next_idx = q_idx + 1
     if next_idx < len(c["questions"]):
         c["q_index"] = next_idx
         next_q = c["questions"][next_idx]
-        append("assistant", f"({next_q['tech']}) {next_q['question']}")
+        append("assistant", c.pop("_next_q_rendered", None) or format_question(next_q))
+        prepare_next_question(c)
     else:
-        # All questions done: save candidate (simulated), thank and finish
-        append("assistant", "That’s all the questions I had. Thank you — we’ve saved your responses and will review them shortly.")
-        st.session_state.storage.save_candidate(st.session_state.candidate)
-        c["q_index"] = None
-        st.session_state.finished = True
+        # All questions done: thank and finish
+        finish_interview(c, "That’s all the questions I had. Thank you — we’ve saved your responses and will review them shortly.")
+
+
+def chat_view(answer: Optional[str]):
+    """
+    Conversation history, handling of a just-submitted answer and interview status.
+    The new answer is shown with the history first, so streamed feedback appears right
+    under it; messages added while handling it are rendered afterwards, in the same run.
+    """
+    if answer:
+        append("user", answer)
+    shown = render_conversation()
+    if answer:
+        handle_answer(answer)
+        render_conversation(start=shown)
+
+    # If chat not started
+    if not st.session_state.chat_started:
+        st.info("Fill candidate details on the left and click **Start Chat**. The Questions will appear here.")
+        return
+
+    # If interview finished
+    if st.session_state.finished:
+        st.success("Interview complete. Candidate saved (simulated).")
+        # Show last saved candidate object (simulated storage)
+        try:
+            st.json(st.session_state.storage.last_saved())
+        except Exception:
+            st.write("Saved candidate (simulated) is not available.")
+        if st.button("Start New Interview"):
+            reset()
+            st.rerun()
+
+
+# ---------------------------
+# Main: Chat interface
+# ---------------------------
+st.markdown("""
+<h1 style='text-align: center; color: #009688; letter-spacing: 1px; font-weight: 800; text-shadow: 1px 1px 3px #009688;'>TalentScout — Interview Chat</h1>
+""", unsafe_allow_html=True)
+
+# Chat input (active interview), pinned to the bottom of the page
+interview_active = st.session_state.chat_started and not st.session_state.finished
+user_input = st.chat_input("Type your answer here... (type 'exit' to finish early)") if interview_active else None
+
+chat_view(user_input.strip() if user_input and user_input.strip() else None)
 
-    # Force rerun to reflect new conversation messages
-    st.rerun()
\ No newline at end of file
+if interview_active and st.session_state.finished:
+    # the answer just handled ended the interview: rerun once to drop the chat input
+    st.rerun()
@@ -1,16 +1,146 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property, lru_cache
+from typing import Iterator
+
+import httpx
 import streamlit as st
 from openai import OpenAI
 
-API_KEY = st.secrets["API_KEY"]
 BASE_URL = "https://openrouter.ai/api/v1"
+MODEL = "moonshotai/kimi-k2:free"
+# Small, fast model for preprocessing work (e.g. condensing long answers)
+CHEAP_MODEL = "meta-llama/llama-3.2-3b-instruct:free"
+CACHE_MAXSIZE = 1024
+TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+MAX_RETRIES = 3
+WARMUP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+KEEPALIVE_EXPIRY = 60.0
+
+# Exact-prompt response cache, shared by every session in this process.
+# Keys are SHA-256 digests of (model, json_mode, prompt) so memory per entry stays small.
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(prompt: str, model: str, json_mode: bool) -> str:
+    return hashlib.sha256(f"{model}\0{json_mode:d}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _api_key() -> str:
+    """
+    OpenRouter API key: the OPENROUTER_API_KEY env var if set (works outside the Streamlit
+    runtime, e.g. batch jobs or containers), else API_KEY from .streamlit/secrets.toml.
+    Resolved once per process.
+    """
+    return os.environ.get("OPENROUTER_API_KEY") or st.secrets["API_KEY"]
+
 
 class OpenRouterClient:
     def __init__(self):
-        self.client = OpenAI(api_key=API_KEY, base_url=BASE_URL)
+        self._last_used = 0.0  # time.monotonic() of the last request on this client
+
+    @cached_property
+    def client(self) -> OpenAI:
+        """
+        Underlying OpenAI client, built on first request so that importing this module
+        or constructing OpenRouterClient doesn't read secrets or open connection pools.
+        """
+        # One pooled HTTP/2 connection per client: TLS is negotiated once and
+        # concurrent requests are multiplexed instead of opening new sockets.
+        return OpenAI(
+            api_key=_api_key(),
+            base_url=BASE_URL,
+            timeout=TIMEOUT,
+            max_retries=MAX_RETRIES,
+            http_client=httpx.Client(
+                http2=True,
+                timeout=TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=16, keepalive_expiry=KEEPALIVE_EXPIRY),
+            ),
+        )
+
+    def generate(self, prompt: str, bypass_cache: bool = False, json_mode: bool = False) -> str:
+        """
+        Return the model completion for prompt, serving repeats from the response cache.
+        Use bypass_cache=True for prompts that will never repeat (e.g. ones embedding free-text answers).
+        json_mode=True requests a JSON object response (response_format); the prompt should describe the shape.
+        """
+        return self._cached_complete(prompt, MODEL, bypass_cache, json_mode)
+
+    def generate_cheap(self, prompt: str, bypass_cache: bool = False) -> str:
+        """Like generate, but on CHEAP_MODEL: for preprocessing that doesn't need the primary model."""
+        return self._cached_complete(prompt, CHEAP_MODEL, bypass_cache, False)
+
+    def forget(self, prompt: str, json_mode: bool = False):
+        """
+        Drop the cached generate() response for prompt. Callers use this when a cached reply
+        turned out to be unusable (e.g. unparsable), so later calls ask the model again.
+        """
+        with _cache_lock:
+            _cache.pop(_cache_key(prompt, MODEL, json_mode), None)
+
+    def warmup(self, idle_for: float = 0.0):
+        """
+        Issue a 1-token completion to open (or keep alive) the pooled connection.
+        Skipped if the client was used within the last idle_for seconds; never raises.
+        """
+        if time.monotonic() - self._last_used < idle_for:
+            return
+        try:
+            self._last_used = time.monotonic()
+            # best effort: a failed ping isn't worth SDK backoff sleeps on a background thread
+            self.client.with_options(max_retries=0, timeout=WARMUP_TIMEOUT).chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": "ok"}],
+                max_tokens=1,
+            )
+        except Exception as e:
+            print(f"[WARN] LLM warmup failed: {e}")
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion for prompt piece by piece as the model produces it (uncached)."""
+        self._last_used = time.monotonic()
+        stream = self.client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        for chunk in stream:
+            # keep-alive / usage chunks carry no choices
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _cached_complete(self, prompt: str, model: str, bypass_cache: bool, json_mode: bool) -> str:
+        if bypass_cache:
+            return self._complete(prompt, model, json_mode)
+
+        key = _cache_key(prompt, model, json_mode)
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+
+        text = self._complete(prompt, model, json_mode)
+        if not text:
+            # don't pin an empty completion; let the next call retry the model
+            return text
+        with _cache_lock:
+            _cache[key] = text
+            if len(_cache) > CACHE_MAXSIZE:
+                _cache.popitem(last=False)
+        return text
 
-    def generate(self, prompt: str) -> str:
+    def _complete(self, prompt: str, model: str = MODEL, json_mode: bool = False) -> str:
+        self._last_used = time.monotonic()
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
         chat = self.client.chat.completions.create(
-            model="moonshotai/kimi-k2:free",
+            model=model,
             messages=[{"role": "user", "content": prompt}],
+            **extra,
         )
-        return chat.choices[0].message.content.strip()
\ No newline at end of file
+        return chat.choices[0].message.content.strip()